@@ -1,4 +1,14 @@
+import hashlib
+import io
+import operator
+import os
 import pathlib
+import pickle
+import re
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 
 script_directory = pathlib.Path(__file__).resolve().parent
 commons = script_directory / "civil-society" / "common"
@@ -7,250 +17,273 @@ commons = script_directory / "civil-society" / "common"
 ###################
 # PARADOX PARSER  #
 ###################
+# Whitespace and line comments, consumed as a single span
+_WHITESPACE_RE = re.compile(r'(?:[ \t\n\r]+|#[^\n]*)*')
+# An unquoted identifier, which runs until a structural character or whitespace,
+# together with the whitespace and comments after it, in one match
+_IDENTIFIER_TOKEN_RE = re.compile(r'([^{}=#\n\r\t ]*)(?:[ \t\n\r]+|#[^\n]*)*')
+# Body of a quoted string up to (not including) the closing quote
+_STRING_BODY_RE = {
+    '"': re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL),
+    "'": re.compile(r"[^'\\]*(?:\\.[^'\\]*)*", re.DOTALL),
+}
+_ESCAPE_RE = re.compile(r'\\(.)', re.DOTALL)
+# Single-character classes checked once per token
+_COMPARISON_CHARS = frozenset('<>')
+_STRING_DELIMITERS = frozenset('"\'')
+# Identifiers that show up in nearly every file, shared across parsers
+_COMMON_IDENTIFIERS = {
+    word: word for word in map(sys.intern, (
+        'yes', 'no', 'icon', 'visible', 'possible', 'NOT', 'AND', 'OR',
+        'if', 'else', 'limit', 'value', 'add', 'subtract', 'multiply',
+        'divide', 'min', 'max', 'scope', 'is_shown', 'is_valid', 'effect',
+        'name', 'target', 'add_to_global_variable_list',
+    ))
+}
+
+
 class ParadoxParser:
-    """Recursive parser for Paradox Interactive game script files."""
+    """Parser for Paradox Interactive game script files."""
+    
+    __slots__ = ('text', 'pos', 'length', '_identifiers')
     
     def __init__(self, text):
         self.text = text
         self.pos = 0
         self.length = len(text)
+        self._identifiers = dict(_COMMON_IDENTIFIERS)
     
     def parse(self):
         """Parse the entire document and return the tree structure."""
         return self.parse_object()
     
-    def current_char(self):
-        """Get current character without advancing position."""
-        if self.pos < self.length:
-            return self.text[self.pos]
-        return None
-    
-    def peek_char(self, offset=1):
-        """Peek ahead at character."""
-        if self.pos + offset < self.length:
-            return self.text[self.pos + offset]
-        return None
-    
-    def advance(self):
-        """Move to next character."""
-        self.pos += 1
-    
-    def skip_whitespace(self):
-        """Skip whitespace and comments."""
-        while self.pos < self.length:
-            char = self.current_char()
-            
-            # Skip whitespace
-            if char in ' \t\n\r':
-                self.advance()
-            # Skip line comments
-            elif char == '#':
-                while self.current_char() and self.current_char() != '\n':
-                    self.advance()
-            else:
-                break
-    
     def parse_string(self):
         """Parse a quoted string."""
-        quote_char = self.current_char()
-        self.advance()  # Skip opening quote
-        
-        result = []
-        while self.current_char() and self.current_char() != quote_char:
-            if self.current_char() == '\\':
-                self.advance()
-                if self.current_char():
-                    result.append(self.current_char())
-                    self.advance()
-            else:
-                result.append(self.current_char())
-                self.advance()
+        text = self.text
+        quote_char = text[self.pos]
+        start = self.pos + 1
         
-        if self.current_char() == quote_char:
-            self.advance()  # Skip closing quote
+        # Fast path: closing quote found with no escapes before it
+        end = text.find(quote_char, start)
+        if end != -1 and text.find('\\', start, end) == -1:
+            self.pos = end + 1
+            return text[start:end]
         
-        return ''.join(result)
-    
-    def parse_identifier(self):
-        """Parse an unquoted identifier or value."""
-        result = []
+        # Everything up to the closing quote, skipping escaped characters
+        match = _STRING_BODY_RE[quote_char].match(text, start)
+        result = match.group()
+        pos = match.end()
         
-        while self.current_char():
-            char = self.current_char()
-            
-            # Stop at structural characters or whitespace
-            if char in '{}=#\n\r\t ':
-                break
-            
-            result.append(char)
-            self.advance()
+        if pos < self.length and text[pos] == '\\':
+            pos += 1  # Dangling escape at end of input
+        elif pos < self.length:
+            pos += 1  # Skip closing quote
         
-        return ''.join(result)
+        self.pos = pos
+        
+        if '\\' in result:
+            result = _ESCAPE_RE.sub(r'\1', result)
+        
+        return result
     
     def parse_comparison_or_value(self):
-        """Parse a comparison expression (a > b) or a simple value."""
-        # Save position in case we need to backtrack
-        start_pos = self.pos
+        """Parse a comparison expression (a > b) or a simple value.
         
-        # Parse first part
-        first = self.parse_identifier()
+        Leaves the position on the next significant character.
+        """
+        text = self.text
+        length = self.length
+        identifiers = self._identifiers
         
-        self.skip_whitespace()
+        # Parse first part, along with the whitespace after it
+        match = _IDENTIFIER_TOKEN_RE.match(text, self.pos)
+        first = match.group(1)
+        first = identifiers.setdefault(first, first)
+        pos = match.end()
         
         # Check if followed by comparison operator
-        char = self.current_char()
-        if char in '<>':
-            operator = char
-            self.advance()
+        if pos < length and text[pos] in _COMPARISON_CHARS:
+            op = text[pos]
+            pos += 1
             
             # Check for compound operators (<=, >=, etc.)
-            if self.current_char() == '=':
-                operator += self.current_char()
-                self.advance()
-            
-            self.skip_whitespace()
+            if pos < length and text[pos] == '=':
+                op += '='
+                pos += 1
             
             # Parse right side
-            second = self.parse_identifier()
+            match = _IDENTIFIER_TOKEN_RE.match(text, _WHITESPACE_RE.match(text, pos).end())
+            self.pos = match.end()
+            second = match.group(1)
+            second = identifiers.setdefault(second, second)
             
-            # Return as a comparison expression string
-            return f"{first}{operator}{second}"
+            # Return as a comparison expression string, shared like identifiers
+            comparison = f"{first}{op}{second}"
+            return identifiers.setdefault(comparison, comparison)
         
         # Not a comparison, just return the first part
+        self.pos = pos
         return first
     
-    def parse_value(self):
-        """Parse a single value (string, number, identifier, or object)."""
-        self.skip_whitespace()
-        
-        char = self.current_char()
-        
-        if char is None:
-            return None
-        
-        # Quoted string
-        if char in '"\'':
-            return self.parse_string()
-        
-        # Nested object
-        if char == '{':
-            return self.parse_object()
-        
-        # Unquoted identifier, number, or comparison expression
-        return self.parse_comparison_or_value()
-    
     def parse_object(self):
-        """Parse an object (dictionary or list)."""
-        self.skip_whitespace()
+        """Parse an object (dictionary or list).
         
-        items = []  # Track all items to detect structure
+        Nested objects are handled with an explicit stack rather than
+        recursion, so deep nesting costs no extra Python frames.
+        """
+        text = self.text
+        length = self.length
+        skip_whitespace = _WHITESPACE_RE.match
+        pos = skip_whitespace(text, self.pos).end()
         
         # Handle opening brace if present
-        if self.current_char() == '{':
-            self.advance()
-        
-        while self.current_char():
-            self.skip_whitespace()
-            
-            # Check for closing brace
-            if self.current_char() == '}':
-                self.advance()
-                break
-            
-            # End of input
-            if self.current_char() is None:
-                break
-            
-            # Parse key (might be a comparison expression)
-            key = self.parse_comparison_or_value()
-            
-            if key is None:
-                break
-            
-            self.skip_whitespace()
-            
-            # Check for assignment operator (only =)
-            char = self.current_char()
-            
-            if char == '=':
-                operator = char
-                self.advance()
+        if pos < length and text[pos] == '{':
+            pos = skip_whitespace(text, pos + 1).end()
+        
+        # Enclosing objects still being parsed, innermost last
+        stack = []
+        
+        items = []  # (key, value, has_operator) for every item
+        
+        # Structure flags, tracked as items are parsed
+        all_have_operators = True
+        none_have_operators = True
+        has_duplicates = False
+        seen_keys = set()
+        
+        # pos always rests on a significant character (or the end) at the top of the loop
+        while True:
+            if pos < length and text[pos] != '}':
+                # Parse key (might be a comparison expression)
+                self.pos = pos
+                key = self.parse_comparison_or_value()
+                pos = self.pos
                 
-                # Check for compound operators (==)
-                if self.current_char() == '=':
-                    operator += self.current_char()
-                    self.advance()
+                # Check for assignment operator (only =)
+                if pos < length and text[pos] == '=':
+                    pos += 1
+                    
+                    # Check for compound operators (==)
+                    if pos < length and text[pos] == '=':
+                        pos += 1
+                    
+                    # Parse the value after the operator
+                    pos = skip_whitespace(text, pos).end()
+                    if pos >= length:
+                        value = None
+                    else:
+                        char = text[pos]
+                        if char == '{':
+                            # Nested object: park this one and start the child
+                            stack.append((items, all_have_operators, none_have_operators,
+                                          has_duplicates, seen_keys, key))
+                            items = []
+                            all_have_operators = True
+                            none_have_operators = True
+                            has_duplicates = False
+                            seen_keys = set()
+                            pos = skip_whitespace(text, pos + 1).end()
+                            continue
+                        
+                        self.pos = pos
+                        if char in _STRING_DELIMITERS:
+                            value = self.parse_string()
+                            pos = skip_whitespace(text, self.pos).end()
+                        else:
+                            value = self.parse_comparison_or_value()
+                            pos = self.pos
+                    
+                    # Store as key-value pair
+                    items.append((key, value, True))
+                    none_have_operators = False
                 
-                self.skip_whitespace()
+                else:
+                    # No operator - just a standalone key (or comparison expression)
+                    items.append((key, True, False))
+                    all_have_operators = False
+            
+            else:
+                # Closing brace or end of input finishes the current object
+                if pos < length:
+                    pos = skip_whitespace(text, pos + 1).end()
                 
-                # Parse the value after the operator
-                value = self.parse_value()
+                value = self._build_object(items, all_have_operators,
+                                           none_have_operators, has_duplicates)
+                if not stack:
+                    break
                 
-                # Store as key-value pair
-                items.append({'key': key, 'value': value, 'has_operator': True})
+                # Attach the finished object to its parent
+                (items, all_have_operators, none_have_operators,
+                 has_duplicates, seen_keys, key) = stack.pop()
+                items.append((key, value, True))
+                none_have_operators = False
             
+            if key in seen_keys:
+                has_duplicates = True
             else:
-                # No operator - just a standalone key (or comparison expression)
-                items.append({'key': key, 'value': True, 'has_operator': False})
+                seen_keys.add(key)
         
-        # Now decide structure based on items
+        self.pos = pos
+        return value
+    
+    @staticmethod
+    def _build_object(items, all_have_operators, none_have_operators, has_duplicates):
+        """Decide the structure of a parsed object from its items."""
         if not items:
             return {}
         
-        # Check if all items have operators (key=value pairs)
-        all_have_operators = all(item['has_operator'] for item in items)
-        none_have_operators = all(not item['has_operator'] for item in items)
-        
-        # Get all unique keys
-        keys = [item['key'] for item in items]
-        unique_keys = set(keys)
-        has_duplicates = len(keys) != len(unique_keys)
-        
         if all_have_operators and not has_duplicates:
             # All key=value pairs with unique keys -> simple dict
-            result = {}
-            for item in items:
-                result[item['key']] = item['value']
-            return result
+            return {key: value for key, value, _ in items}
         
         elif all_have_operators and has_duplicates:
             # Multiple key=value pairs, some keys repeated -> list of dicts
-            result = []
-            for item in items:
-                result.append({item['key']: item['value']})
-            return result
+            return [{key: value} for key, value, _ in items]
         
         elif none_have_operators:
             # All standalone keys -> dict with True values
             result = {}
-            for item in items:
-                if item['key'] in result:
+            for key, _, _ in items:
+                if key in result:
                     # Convert to list for duplicates
-                    if not isinstance(result[item['key']], list):
-                        result[item['key']] = [result[item['key']]]
-                    result[item['key']].append(True)
+                    if not isinstance(result[key], list):
+                        result[key] = [result[key]]
+                    result[key].append(True)
                 else:
-                    result[item['key']] = True
+                    result[key] = True
             return result
         
         else:
             # Mixed: some with operators, some without
             # Keep as dict but handle duplicates
             result = {}
-            for item in items:
-                if item['key'] in result:
+            for key, value, _ in items:
+                if key in result:
                     # Convert to list if duplicate key
-                    if not isinstance(result[item['key']], list):
-                        result[item['key']] = [result[item['key']]]
-                    result[item['key']].append(item['value'])
+                    if not isinstance(result[key], list):
+                        result[key] = [result[key]]
+                    result[key].append(value)
                 else:
-                    result[item['key']] = item['value']
+                    result[key] = value
             return result
 
 
+# Characters that force a string value to be written quoted
+_QUOTED_CHARS = frozenset(' ={}#')
+# Comparison operators, longer ones first so they win when formatting
+_COMPARISON_OPS = ('>=', '<=', '!=', '>', '<', '=')
+# Every operator above contains one of these characters
+_COMPARISON_OP_RE = re.compile(r'[<>=]')
+
+
 class ParadoxWriter:
+    __slots__ = ('indent_char', '_indents', '_quoted', '_comparisons')
+    
     def __init__(self, indent_char='\t'):
         self.indent_char = indent_char
+        self._indents = ['']  # Indent string for each nesting level
+        self._quoted = {}  # Written form of each string value seen so far
+        self._comparisons = {}  # Spaced-out form of each key, '' if not a comparison
     
     def write(self, obj, indent_level=0):
         """
@@ -267,103 +300,273 @@ class ParadoxWriter:
             return ""
         
         if isinstance(obj, dict):
-            return self._write_dict(obj, indent_level)
+            buf = io.StringIO()
+            self._write_dict(buf, obj, indent_level)
         elif isinstance(obj, list):
-            return self._write_list(obj, indent_level)
+            buf = io.StringIO()
+            self._write_list(buf, obj, indent_level)
         else:
             return self._write_value(obj)
+        
+        # Every line is newline-terminated; drop the final one
+        return buf.getvalue()[:-1]
+    
+    def _indent(self, indent_level):
+        """Get the indent string for a nesting level."""
+        indents = self._indents
+        while len(indents) <= indent_level:
+            indents.append(indents[-1] + self.indent_char)
+        return indents[indent_level]
     
-    def _write_dict(self, d, indent_level):
-        """Write a dictionary as Paradox script."""
-        lines = []
-        indent = self.indent_char * indent_level
+    def _write_dict(self, buf, d, indent_level):
+        """Write a dictionary as Paradox script. Returns whether any line was written."""
+        indent = self._indent(indent_level)
+        wrote = False
         
         for key, value in d.items():
-            # Handle comparison operators - write them without '=' but with spaces around operators
-            if self._is_comparison(key):
-                formatted_key = self._format_comparison(key)
-                lines.append(f"{indent}{formatted_key}")
-                continue
-            if isinstance(value, dict):
-                # For nested dicts, write key = { ... }
-                lines.append(f"{indent}{key} = {{")
-                lines.append(self._write_dict(value, indent_level + 1))
-                lines.append(f"{indent}}}")
-            elif isinstance(value, list):
-                # For lists, write key = { ... } (without extra braces)
-                list_content = self._write_list(value, indent_level + 1)
-                if list_content.strip():  # Only write if list has content
-                    lines.append(f"{indent}{key} = {{")
-                    lines.append(list_content)
-                    lines.append(f"{indent}}}")
-            else:
-                # For simple values, write key = value
-                lines.append(f"{indent}{key} = {self._write_value(value)}")
+            if self._write_entry(buf, key, value, indent, indent_level):
+                wrote = True
         
-        return '\n'.join(lines)
+        return wrote
     
-    def _write_list(self, lst, indent_level):
-        """Write a list as Paradox script."""
-        lines = []
-        indent = self.indent_char * indent_level
+    def _write_entry(self, buf, key, value, indent, indent_level):
+        """Write a single key = value entry. Returns whether anything was written."""
+        # Handle comparison operators - write them without '=' but with spaces around operators
+        formatted_key = self._comparison_key(key)
+        if formatted_key:
+            buf.write(f"{indent}{formatted_key}\n")
+        elif isinstance(value, dict):
+            # For nested dicts, write key = { ... }
+            buf.write(f"{indent}{key} = {{\n")
+            if not self._write_dict(buf, value, indent_level + 1):
+                buf.write("\n")  # Empty blocks keep a blank line
+            buf.write(f"{indent}}}\n")
+        elif isinstance(value, list):
+            # For lists, write key = { ... } (without extra braces)
+            start = buf.tell()
+            buf.write(f"{indent}{key} = {{\n")
+            if not self._write_list(buf, value, indent_level + 1):
+                # Only write if list has content
+                buf.seek(start)
+                buf.truncate()
+                return False
+            buf.write(f"{indent}}}\n")
+        else:
+            # For simple values, write key = value
+            buf.write(f"{indent}{key} = {self._write_value(value)}\n")
+        return True
+    
+    def _write_list(self, buf, lst, indent_level):
+        """Write a list as Paradox script. Returns whether any non-blank content was written."""
+        indent = self._indent(indent_level)
+        has_content = False
         
         for item in lst:
-            if isinstance(item, dict):
+            if isinstance(item, tuple):
+                # (key, value) pairs are written like a single-entry dict
+                key, value = item
+                if self._write_entry(buf, key, value, indent, indent_level):
+                    has_content = True
+            elif isinstance(item, dict):
                 # For dict items in a list, write the dict content directly (no extra braces)
-                dict_content = self._write_dict(item, indent_level)
-                if dict_content.strip():
-                    lines.append(dict_content)
+                if self._write_dict(buf, item, indent_level):
+                    has_content = True
             elif isinstance(item, list):
                 # Nested lists are flattened - just process their contents
-                nested_content = self._write_list(item, indent_level)
-                if nested_content.strip():
-                    lines.append(nested_content)
+                start = buf.tell()
+                if self._write_list(buf, item, indent_level):
+                    has_content = True
+                else:
+                    buf.seek(start)
+                    buf.truncate()
             else:
                 # For simple values in a list
-                lines.append(f"{indent}{self._write_value(item)}")
+                value = self._write_value(item)
+                buf.write(f"{indent}{value}\n")
+                if value.strip():
+                    has_content = True
         
-        return '\n'.join(lines)
+        return has_content
     
     def _write_value(self, value):
         """Convert a value to its Paradox script representation."""
         if isinstance(value, bool):
             return "yes" if value else "no"
         elif isinstance(value, str):
-            # Check if string needs quotes (contains spaces or special chars)
-            if ' ' in value or any(c in value for c in ['=', '{', '}', '#']):
-                return f'"{value}"'
-            return value
+            written = self._quoted.get(value)
+            if written is None:
+                # Check if string needs quotes (contains spaces or special chars)
+                written = value if _QUOTED_CHARS.isdisjoint(value) else f'"{value}"'
+                self._quoted[value] = written
+            return written
         elif isinstance(value, (int, float)):
             return str(value)
         else:
             return str(value)
     
+    def _comparison_key(self, key):
+        """Get the formatted comparison for a key, or '' for a plain key."""
+        formatted_key = self._comparisons.get(key)
+        if formatted_key is None:
+            formatted_key = self._format_comparison(key) if self._is_comparison(key) else ''
+            self._comparisons[key] = formatted_key
+        return formatted_key
+    
     def _is_comparison(self, key):
         """Check if a key is a comparison expression."""
-        comparison_ops = ['>=', '<=', '!=', '>', '<', '=']
-        return any(op in key for op in comparison_ops)
+        return _COMPARISON_OP_RE.search(key) is not None
     
     def _format_comparison(self, key):
         """Add spaces around comparison operators."""
         # Order matters - check longer operators first
-        comparison_ops = ['>=', '<=', '!=', '>', '<', '=']
-        for op in comparison_ops:
+        for op in _COMPARISON_OPS:
             if op in key:
                 parts = key.split(op, 1)
                 return f"{parts[0].strip()} {op} {parts[1].strip()}"
         return key
 
 
+# Below this much input text, starting worker processes costs more than it saves.
+# Serial parsing runs at roughly 12 MB/s, so this is about 0.3 s of work, while
+# spawning a pool (the only start method on Windows) takes ~70 ms by itself.
+PARALLEL_PARSE_MIN_BYTES = 4 * 1024 * 1024
+# Below this many output files, a thread pool costs more than it saves
+PARALLEL_WRITE_MIN_FILES = 4
+# Parsed trees are cached here between runs, one pickle per input file
+PARSE_CACHE_DIR = script_directory / ".parse_cache"
+# Set PARADOX_NOCACHE=1 to always parse from scratch
+PARSE_CACHE_ENABLED = not os.environ.get("PARADOX_NOCACHE")
+# Editing this script (and so possibly the parser) invalidates every cache entry
+_SCRIPT_STAT = os.stat(__file__)
+_PARSER_STAMP = (_SCRIPT_STAT.st_mtime_ns, _SCRIPT_STAT.st_size)
+
+# Templates are parsed once with a neutral stand-in for <<root>>, then filled per root
+_TEMPLATE_ROOT = "<<root>>"
+_TEMPLATE_STAND_IN = "\x00root\x00"
+# Roots containing any of these could tokenize differently once substituted
+# (a backslash starts an escape when <<root>> sits inside a quoted string)
+_TEMPLATE_UNSAFE_CHARS = frozenset('{}=#\n\r\t <>"\'\\\x00')
+_template_trees = {}
+
+
 class ParadoxHelper:
     @staticmethod
     def parse_file(filepath):
         """Parse a Paradox script file and return the tree structure."""
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Decode the raw bytes in one go instead of through a text-mode reader
+        with open(filepath, 'rb') as f:
+            content = f.read().decode('utf-8')
+        if '\r' in content:
+            # Match the universal-newline translation text mode used to do
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
         
         parser = ParadoxParser(content)
         return parser.parse()
 
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def read_template(name):
+        """Read a file from repetitemplate/, once per run."""
+        return (script_directory / "repetitemplate" / name).read_text()
+
+    @staticmethod
+    def parse_template(template, root):
+        """Parse template with every <<root>> replaced by root.
+        
+        Gives the same tree as ParadoxParser(template.replace("<<root>>", root)).parse(),
+        but each template is only parsed the first time it is seen.
+        """
+        if not root or not _TEMPLATE_UNSAFE_CHARS.isdisjoint(root):
+            return ParadoxParser(template.replace(_TEMPLATE_ROOT, root)).parse()
+        
+        tree = _template_trees.get(template)
+        if tree is None:
+            # Templates only change along with this script, so its stamp is enough
+            name = hashlib.blake2b(template.encode('utf-8'), digest_size=16).hexdigest()
+            cache_path = PARSE_CACHE_DIR / f"template-{name}.pkl"
+            tree = ParadoxHelper._read_cache_entry(cache_path, _PARSER_STAMP) if PARSE_CACHE_ENABLED else None
+            if tree is None:
+                tree = ParadoxParser(template.replace(_TEMPLATE_ROOT, _TEMPLATE_STAND_IN)).parse()
+                if PARSE_CACHE_ENABLED:
+                    ParadoxHelper._write_cache_entry(cache_path, _PARSER_STAMP, tree)
+            _template_trees[template] = tree
+        
+        def fill(node):
+            if isinstance(node, dict):
+                result = {(key.replace(_TEMPLATE_STAND_IN, root) if isinstance(key, str) else key): fill(value)
+                          for key, value in node.items()}
+                if len(result) != len(node):
+                    raise ValueError("keys collide once filled")
+                return result
+            elif isinstance(node, list):
+                return [fill(item) for item in node]
+            elif isinstance(node, str):
+                return node.replace(_TEMPLATE_STAND_IN, root)
+            else:
+                return node
+        
+        try:
+            return fill(tree)
+        except ValueError:
+            # Filled keys would have been parsed as duplicates, so parse for real
+            return ParadoxParser(template.replace(_TEMPLATE_ROOT, root)).parse()
+
+    @staticmethod
+    def parse_file_cached(filepath):
+        """Parse a script file, reusing the cached tree if the file is unchanged."""
+        st = os.stat(filepath)
+        stamp = (st.st_mtime_ns, st.st_size, _PARSER_STAMP)
+        name = hashlib.blake2b(os.fsencode(os.path.abspath(filepath)), digest_size=16).hexdigest()
+        cache_path = PARSE_CACHE_DIR / f"{name}.pkl"
+        
+        tree = ParadoxHelper._read_cache_entry(cache_path, stamp)
+        if tree is None:
+            tree = ParadoxHelper.parse_file(filepath)
+            ParadoxHelper._write_cache_entry(cache_path, stamp, tree)
+        return tree
+
+    @staticmethod
+    def _read_cache_entry(cache_path, stamp):
+        """Return the tree cached under cache_path if it was stored with stamp, else None."""
+        try:
+            with open(cache_path, 'rb') as f:
+                cached_stamp, tree = pickle.load(f)
+            if cached_stamp == stamp:
+                return tree
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass  # Missing or unreadable entry, parse again
+        return None
+
+    @staticmethod
+    def _write_cache_entry(cache_path, stamp, tree):
+        # Write to a temporary name first so a half-written entry is never read
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            PARSE_CACHE_DIR.mkdir(exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((stamp, tree), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # An unwritable cache only costs the next run a re-parse
+
+    @staticmethod
+    def list_script_files(directory):
+        """Return the paths of the .txt script files directly inside a directory."""
+        with os.scandir(directory) as entries:
+            return [entry.path for entry in entries
+                    if entry.name.endswith('.txt') and entry.is_file()]
+
+    @staticmethod
+    def parse_files(filepaths):
+        """Parse several script files, in worker processes when there is enough text."""
+        filepaths = list(filepaths)
+        parse = ParadoxHelper.parse_file_cached if PARSE_CACHE_ENABLED else ParadoxHelper.parse_file
+        if sum(os.stat(filepath).st_size for filepath in filepaths) < PARALLEL_PARSE_MIN_BYTES:
+            return [parse(filepath) for filepath in filepaths]
+        
+        with ProcessPoolExecutor() as executor:
+            return list(executor.map(parse, filepaths, chunksize=4))
+
     @staticmethod
     def replace_leaves(tree, old_str, new_str):
         """
@@ -375,26 +578,10 @@ class ParadoxHelper:
             new_str: String to replace with
             
         Returns:
-            A new tree with replacements applied
+            A tree with replacements applied; subtrees without a match are
+            shared with the input rather than copied
         """
-        if isinstance(tree, dict):
-            result = {}
-            for key, value in tree.items():
-                # Also check if the key itself contains the old_str
-                new_key = key.replace(old_str, new_str) if (isinstance(key, str) and key.strip() == old_str) else key
-                result[new_key] = ParadoxHelper.replace_leaves(value, old_str, new_str)
-            return result
-        elif isinstance(tree, list):
-            return [ParadoxHelper.replace_leaves(item, old_str, new_str) for item in tree]
-        elif isinstance(tree, str):
-            if tree.strip() == old_str:
-                return tree.replace(old_str, new_str)
-            else:
-                return tree
-        else:
-            # For non-string primitives (int, float, bool, None), return as-is
-            return tree
-    
+        return ParadoxHelper.multi_replace_leaves(tree, [(old_str, new_str)])
 
     @staticmethod
     def multi_replace_leaves(tree, pairs):
@@ -405,17 +592,59 @@ class ParadoxHelper:
             tree: The parsed tree structure (dict, list, or primitive)
             pairs: List of (old_str, new_str) tuples
         Returns:
-            A new tree with replacements applied
+            A tree with replacements applied; subtrees without a match are
+            shared with the input rather than copied
         """
-        for old_str, new_str in pairs:
-            tree = ParadoxHelper.replace_leaves(tree, old_str, new_str)
-        return tree
+        pairs = list(pairs)
+        old_strs = {old_str for old_str, _ in pairs}
+        
+        def replace(leaf):
+            # Same result as applying replace_leaves once per pair, in order
+            if leaf.strip() not in old_strs:
+                return leaf
+            for old_str, new_str in pairs:
+                if leaf.strip() == old_str:
+                    leaf = leaf.replace(old_str, new_str)
+            return leaf
+        
+        def walk(node):
+            if isinstance(node, dict):
+                values = [walk(value) for value in node.values()]
+                keys = [replace(key) if isinstance(key, str) else key for key in node]
+                if (all(map(operator.is_, keys, node))
+                        and all(map(operator.is_, values, node.values()))):
+                    return node  # Nothing matched below here
+                if len(set(keys)) == len(keys):
+                    return dict(zip(keys, values))
+                
+                # Renamed keys collide: merge them pass by pass, as separate walks would
+                result = dict(zip(node, values))
+                for old_str, new_str in pairs:
+                    result = {(key.replace(old_str, new_str)
+                               if isinstance(key, str) and key.strip() == old_str else key): value
+                              for key, value in result.items()}
+                return result
+            elif isinstance(node, list):
+                items = [walk(item) for item in node]
+                return node if all(map(operator.is_, items, node)) else items
+            elif isinstance(node, str):
+                return replace(node)
+            else:
+                return node
+        
+        # One walk over the tree no matter how many pairs there are
+        return walk(tree)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def shared_writer(indent_char='\t'):
+        """One ParadoxWriter per indent style, so its caches carry over between calls."""
+        return ParadoxWriter(indent_char=indent_char)
 
     @staticmethod
     def dict_to_paradox(tree, indent_char='\t'):
         """Convert a parsed tree structure back to Paradox script format."""
-        writer = ParadoxWriter(indent_char=indent_char)
-        return writer.write(tree)
+        return ParadoxHelper.shared_writer(indent_char).write(tree)
 
     @staticmethod
     def get_root(tree):
@@ -427,6 +656,22 @@ class ParadoxHelper:
         root = ParadoxHelper.get_root(tree)
         return block_name in tree[root]
 
+    @staticmethod
+    def target_in_list(list_name, flag):
+        """The is_target_in_variable_list trigger for flag in a global list."""
+        return {"is_target_in_variable_list": [
+            ("name", list_name),
+            ("target", flag)
+        ]}
+
+    @staticmethod
+    def add_to_global_list(list_name, flag):
+        """The add_to_global_variable_list effect for flag in a global list."""
+        return {"add_to_global_variable_list": [
+            ("name", list_name),
+            ("target", flag)
+        ]}
+
     @staticmethod
     def get_script_block(tree, block_name):
         root = ParadoxHelper.get_root(tree)
@@ -437,18 +682,37 @@ class ParadoxHelper:
 
     @staticmethod
     def write_handled_files(*file_data):
+        # One writer serves every file so its caches carry over
+        writer = ParadoxHelper.shared_writer('\t')
+        pending = []
         for folder, content, filename in file_data:
             folder.mkdir(parents=True, exist_ok=True)
-            filepath = folder / filename
-            paradox_text = ParadoxHelper.dict_to_paradox(content, indent_char='\t')
-            with open(filepath, 'w', encoding='utf-8') as f:
-                # first write a paragraph comment
-                # saying this file is autogenerated 
-                # and should not be edited directly
-                f.write("# This file is autogenerated by always_run.py\n")
-                f.write("# Do not edit this file directly\n\n")
-                f.write(paradox_text)
+            pending.append((folder / filename, writer.write(content)))
+        
+        # Serializing holds the GIL, but the file writes release it
+        if len(pending) < PARALLEL_WRITE_MIN_FILES:
+            for filepath, paradox_text in pending:
+                ParadoxHelper.write_autogen_file(filepath, paradox_text)
+            return
+        
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(lambda item: ParadoxHelper.write_autogen_file(*item), pending))
 
+    @staticmethod
+    def write_autogen_file(filepath, paradox_text):
+        # first write a paragraph comment
+        # saying this file is autogenerated 
+        # and should not be edited directly
+        full_text = ("# This file is autogenerated by always_run.py\n"
+                     "# Do not edit this file directly\n\n") + paradox_text
+        
+        # Leave files that are already up to date untouched, mtime included
+        try:
+            if filepath.read_text(encoding='utf-8') == full_text:
+                return
+        except (OSError, UnicodeDecodeError):
+            pass
+        filepath.write_text(full_text, encoding='utf-8')
 
 from functools import wraps
 
@@ -463,16 +727,20 @@ def handler(folder_path, filename):
         filename: Name of the output file
     """
     def decorator(func):
+        def resolve_folder():
+            # Resolve folder path (could be a lambda for dynamic paths)
+            return folder_path(commons) if callable(folder_path) else folder_path
+        
         @wraps(func)
         def wrapper(self):
             # Call the actual handler method
             content = func(self)
             
-            # Resolve folder path (could be a lambda for dynamic paths)
-            folder = folder_path(commons) if callable(folder_path) else folder_path
-            
             # Return the triple expected by write_handled_files
-            return [folder, content, filename]
+            return [resolve_folder(), content, filename]
+        
+        # Where this handler's file ends up, for the build stamp
+        wrapper.output_path = lambda: resolve_folder() / filename
         
         # Store metadata for registration
         if not hasattr(func, '_is_handler'):
@@ -492,12 +760,19 @@ class HandlerMeta(type):
     def __new__(mcs, name, bases, namespace):
         cls = super().__new__(mcs, name, bases, namespace)
         
-        # Collect all methods marked as handlers
-        handlers = []
-        for attr_name in dir(cls):
-            attr = getattr(cls, attr_name)
+        # Collect all methods marked as handlers. Inherited ones come from the
+        # bases' already collected handlers, minus any name this class redefines,
+        # so only this class's own namespace needs scanning.
+        handlers = {}
+        for base in reversed(bases):
+            handlers.update((wrapper.__name__, wrapper) for wrapper in getattr(base, 'handlers', ()))
+        inherited_names = set(handlers)
+        for attr_name in namespace:
+            handlers.pop(attr_name, None)
+        
+        for attr_name, attr in sorted(namespace.items()):
             if hasattr(attr, '_is_handler') and hasattr(attr, '_wrapper'):
-                handlers.append(attr._wrapper)
+                handlers[attr_name] = attr._wrapper
                 
                 # Register this output file globally
                 folder_path = attr._folder_path
@@ -509,11 +784,16 @@ class HandlerMeta(type):
                     # For lambdas, we can't resolve yet, use a placeholder
                     file_key = f"<dynamic>/{filename}"
                 else:
-                    file_key = str(Path(folder_path) / filename)
+                    file_key = str(pathlib.Path(folder_path) / filename)
+                
+                # An override writing the file of the method it replaces is no duplicate
+                previous = mcs._global_file_registry.get(file_key)
+                overrides_previous = (previous is not None and previous[1] == attr_name
+                                      and attr_name in inherited_names)
                 
                 # Check for duplicates
-                if file_key in mcs._global_file_registry:
-                    previous_class, previous_method = mcs._global_file_registry[file_key]
+                if previous is not None and not overrides_previous:
+                    previous_class, previous_method = previous
                     warnings.warn(
                         f"\n⚠️  DUPLICATE OUTPUT FILE DETECTED ⚠️\n"
                         f"File: {filename}\n"
@@ -528,16 +808,98 @@ class HandlerMeta(type):
                     # Register this file
                     mcs._global_file_registry[file_key] = (name, attr_name)
         
-        cls.handlers = handlers
+        # Same handlers, in the same name order, as scanning dir(cls) would give
+        cls.handlers = [handlers[attr_name] for attr_name in sorted(handlers)]
         return cls
 class BaseHandler(metaclass=HandlerMeta):
     """Base class for all handlers with automatic handler registration."""
     
-    def __init__(self, files):
-        self.parse_and_update(files)
+    def __init__(self, files, trees=None, inputs=None):
+        """Run every handler over files, unless nothing changed since the last run.
+        
+        trees, if given, are the already parsed files, in the same order.
+        inputs, if given, is the input_stamp taken before those trees were parsed.
+        """
+        files = list(files)
+        if inputs is None:
+            # Stat before parsing, so a file saved mid-run is not stamped as built
+            inputs = self.input_stamp(files)
+        if trees is None and self.is_up_to_date(files, inputs):
+            return  # Inputs and outputs are exactly as the last run left them
+        
+        self.parse_and_update(files, trees)
+        
+        if PARSE_CACHE_ENABLED:
+            self.write_build_stamp(self.build_stamp(inputs))
+    
+    @classmethod
+    def is_up_to_date(cls, files, inputs=None):
+        if not PARSE_CACHE_ENABLED:
+            return False
+        stamp = cls.build_stamp(cls.input_stamp(files) if inputs is None else inputs)
+        return stamp is not None and stamp == cls.read_build_stamp()
+    
+    @staticmethod
+    def _stat_all(paths):
+        """(path, mtime, size) of every path, or None if one is missing."""
+        try:
+            return [
+                (os.fspath(path), st.st_mtime_ns, st.st_size)
+                for path in paths
+                for st in (os.stat(path),)
+            ]
+        except FileNotFoundError:
+            return None
+    
+    @classmethod
+    def input_stamp(cls, files):
+        """Stat every input and template of this handler, or None if one is missing."""
+        templates = ParadoxHelper.list_script_files(script_directory / "repetitemplate")
+        return cls._stat_all([*files, *templates])
     
-    def parse_and_update(self, files):
-        self.trees = [ParadoxHelper.parse_file(file) for file in files]
+    @classmethod
+    def build_stamp(cls, inputs):
+        """Combine an input_stamp with the stats of every output, or None if a file is missing."""
+        outputs = cls._stat_all([handler_wrapper.output_path() for handler_wrapper in cls.handlers])
+        if inputs is None or outputs is None:
+            return None
+        return (_PARSER_STAMP, inputs + outputs)
+    
+    @classmethod
+    def _build_stamp_path(cls):
+        return PARSE_CACHE_DIR / f"{cls.__name__}.stamp"
+    
+    @classmethod
+    def read_build_stamp(cls):
+        try:
+            with open(cls._build_stamp_path(), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+    
+    @classmethod
+    def write_build_stamp(cls, stamp):
+        try:
+            PARSE_CACHE_DIR.mkdir(exist_ok=True)
+            with open(cls._build_stamp_path(), 'wb') as f:
+                pickle.dump(stamp, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass  # Without a stamp the next run simply regenerates
+    
+    def institution_icons(self):
+        """The <root>_icon blocks shared by every handler's institution file."""
+        # Icon paths are always written quoted
+        return {
+            f"{root}_icon": [("icon", f"\"{icon}\"")]
+            for root, tree in zip(self.roots, self.trees)
+            if (icon := tree[root].get("icon", None))
+        }
+    
+    def parse_and_update(self, files, trees=None):
+        self.trees = ParadoxHelper.parse_files(files) if trees is None else trees
+        # The root key of each tree, looked up once for every handler
+        self.roots = [ParadoxHelper.get_root(tree) for tree in self.trees]
+        self.flags = [f"flag:{root}" for root in self.roots]
         
         # Collect all handler outputs
         outputs = []
@@ -561,8 +923,7 @@ class CivInstHandler(BaseHandler):
         trees = self.trees
         values_file = {}
         
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
+        for root, tree in zip(self.roots, trees):
             ms_weights = ParadoxHelper.get_script_block(tree, "measure_weights")
             stance = ParadoxHelper.get_script_block(tree, "stance")
             social_impact = ParadoxHelper.multi_replace_leaves(
@@ -572,12 +933,12 @@ class CivInstHandler(BaseHandler):
                     ("size", f"{root}_population"),
                 ]
             ) + [
-                {"round": True}
+                ("round", True)
             ]
 
             values_file[f"{root}_social_impact_base"] = social_impact
             values_file[f"{root}_stance"] = stance
-            values_file[f"{root}_population"] = ParadoxParser("""
+            values_file[f"{root}_population"] = ParadoxHelper.parse_template("""
                 value = 0
                 if = {
                     limit = {
@@ -585,8 +946,8 @@ class CivInstHandler(BaseHandler):
                     }
                     add = var:<<root>>_population
                 }
-            """.replace("<<root>>", root)).parse()
-            values_file[f"{root}_organization"] = ParadoxParser("""
+            """, root)
+            values_file[f"{root}_organization"] = ParadoxHelper.parse_template("""
                 value = 0
                 if = {
                     limit = {
@@ -594,35 +955,33 @@ class CivInstHandler(BaseHandler):
                     }
                     add = var:<<root>>_organization
                 }
-            """.replace("<<root>>", root)).parse()
+            """, root)
 
             values_file[f"{root}_org_trend"] = [
-                {"value": "0"},
-                {"substract": "-0.1"},
+                ("value", "0"),
+                ("substract", "-0.1"),
                 {"add": [
-                    {"value": "ciso_total_unfulfilled_needs"},
-                    {"divide": 10},
+                    ("value", "ciso_total_unfulfilled_needs"),
+                    ("divide", 10),
                 ]},
                 {"if": [
                     {"limit": [
                         {"ciso_ci_is_radical": { "ci": root }}
                     ]},
-                    {
-                        "add": "ciso_total_ci_attraction_num_out"
-                    }
+                    ("add", "ciso_total_ci_attraction_num_out")
                 ]},
                 {"multiply": [
-                    {"value": f"{root}_population" },
-                    { "divide": "state_population" }
+                    ("value", f"{root}_population"),
+                    ("divide", "state_population")
                 ]},
                 # higher org makes gains & losses slower
                 {"multiply": [
-                    {"value": 100},
-                    {"subtract": f"{root}_organization" },
-                    {"divide": 100},
-                    {"min": 0.02}
+                    ("value", 100),
+                    ("subtract", f"{root}_organization"),
+                    ("divide", 100),
+                    ("min", 0.02)
                 ]},
-                {"multiply": 5}
+                ("multiply", 5)
             ]
 
             if ParadoxHelper.has_block(tree, "organization_trend_mult"):
@@ -634,19 +993,15 @@ class CivInstHandler(BaseHandler):
                 "if": [
                 {
                     "limit": [{
-                        "NOT": [{
-                            "exists": "scope:measure"
-                        }]
+                        "NOT": [("exists", "scope:measure")]
                     }]
                 },
                 {
-                    "scope:ms": [{
-                        "save_temporary_scope_as": "measure"
-                    }]
+                    "scope:ms": [("save_temporary_scope_as", "measure")]
                 }
                 ]
             }] + ms_weights
-            values_file[f"{root}_social_impact"] = ParadoxParser("""
+            values_file[f"{root}_social_impact"] = ParadoxHelper.parse_template("""
                 value = 0
                 if = {
                     limit = {
@@ -659,8 +1014,8 @@ class CivInstHandler(BaseHandler):
                     value = var:<<root>>_atmospheric_si_modifier
                     add = 1
                 }
-            """.replace("<<root>>", root)).parse()
-            values_file[f"{root}_avg_sqrt_weight"] = ParadoxParser("""
+            """, root)
+            values_file[f"{root}_avg_sqrt_weight"] = ParadoxHelper.parse_template("""
                 value = 0
                 every_in_global_list = {
                     variable = ciso_society_measures
@@ -685,8 +1040,8 @@ class CivInstHandler(BaseHandler):
                     }
                     min = 1
                 }
-            """.replace("<<root>>", root)).parse()
-            values_file[f"{root}_num_measures"] = ParadoxParser("""
+            """, root)
+            values_file[f"{root}_num_measures"] = ParadoxHelper.parse_template("""
                 value = 0
                 every_in_global_list = {
                     variable = ciso_society_measures
@@ -703,114 +1058,86 @@ class CivInstHandler(BaseHandler):
                         }
                     }
                 }
-            """.replace("<<root>>", root)).parse()
+            """, root)
         
         return values_file
 
     @handler(lambda c: c / "institutions", "CISO_civinsts.txt")
     def handle_institution_icon(self):
-        trees = self.trees
-        institution_icon_file = {}
-        
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            icon = tree[root].get("icon", None)
-            if icon:
-                institution_icon_file[f"{root}_icon"] = [{
-                    "icon": f"\"{icon}\""
-                }]
-
-        return institution_icon_file
+        return self.institution_icons()
 
     @handler(lambda c: c / "scripted_effects", "CISO_process.txt")
     def handle_process(self):
-        trees = self.trees
-        process_file_monthly = []
+        process_tooling = []
+        process_allocation = []
+        process_atmosphere = []
         process_file_size = []
 
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
+        for root, flag in zip(self.roots, self.flags):
             process_file_size.append({
                 "if": [
                 {"limit": [
-                    {"is_target_in_variable_list": [
-                        {"name": "ciso_civil_institutions"},
-                        {"target": f"flag:{root}"}
-                    ]}
+                    ParadoxHelper.target_in_list("ciso_civil_institutions", flag)
                 ]},
-                {"ciso_get_ci_attraction_num": [ { "ci": root } ] },
+                {"ciso_get_ci_attraction_num": [ ("ci", root) ] },
                 {"set_variable": [
-                    {"name": f"{root}_population" },
-                    {"value": "scope:ciso_total_ci_attraction_num_out" }
+                    ("name", f"{root}_population"),
+                    ("value", "scope:ciso_total_ci_attraction_num_out")
                 ]},
                 {"set_variable": [
-                    {"name": f"{root}_social_impact" },
-                    {"value": f"{root}_social_impact_base" }
+                    ("name", f"{root}_social_impact"),
+                    ("value", f"{root}_social_impact_base")
                 ]},
                 {"set_variable": [
-                    {"name": f"{root}_organization" },
+                    ("name", f"{root}_organization"),
                     {"value": [
-                        {"value": f"{root}_organization" },
-                        {"add": f"{root}_org_trend" }
+                        ("value", f"{root}_organization"),
+                        ("add", f"{root}_org_trend")
                     ]}
                 ]}
             ]})
 
-            process_file_monthly.append({
+            # Built in the same pass, but each kind stays grouped in the output
+            process_tooling.append({
                 "ciso_civsoc_process_tooling_handle_creation": [
-                    {"ci": root }
+                    ("ci", root)
                 ]
             })
-
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            process_file_monthly.append({
-                "ciso_calculate_allocation": [ { "ci": root } ]
+            process_allocation.append({
+                "ciso_calculate_allocation": [ ("ci", root) ]
             })
-        
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            process_file_monthly.append({
-                "ciso_calculate_atmosphere_stuff": [ { "ci": root } ]
+            process_atmosphere.append({
+                "ciso_calculate_atmosphere_stuff": [ ("ci", root) ]
             })
 
 
         return {
             "ciso_civsoc_process_monthly": [
-                {"ciso_reset_all_measures_ci_invest": "yes"}
-            ] + process_file_monthly,
+                ("ciso_reset_all_measures_ci_invest", "yes")
+            ] + process_tooling + process_allocation + process_atmosphere,
             "ciso_update_ci_pop": process_file_size
         }
 
     @handler(lambda c: c / "scripted_effects", "CISO_setup.txt")
     def handle_setup(self):
-        trees = self.trees
         init_global = []
         init_global_orgset = []
         
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            init_global.append({
-                "add_to_global_variable_list": [
-                    {"name": "ciso_civil_institutions" },
-                    {"target": f"flag:{root}"}
-                ]
-            })
+        for root, flag in zip(self.roots, self.flags):
+            init_global.append(ParadoxHelper.add_to_global_list("ciso_civil_institutions", flag))
 
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
             if not "tammany" in root:
                 init_global_orgset.append({
                     "set_variable": [
-                        {"name": f"{root}_organization" },
-                        {"value": 20 }
+                        ("name", f"{root}_organization"),
+                        ("value", 20)
                     ]
                 })
             else:
                 init_global_orgset.append({
                     "set_variable": [
-                        {"name": f"{root}_organization" },
-                        {"value": 80 }
+                        ("name", f"{root}_organization"),
+                        ("value", 80)
                     ]
                 })
         
@@ -819,7 +1146,7 @@ class CivInstHandler(BaseHandler):
         return {
             "ciso_init_civsoc_global": init_global + [{
                 "every_state": [
-                    {"limit": [ { "ciso_state_has_civil_society": "yes"}]}
+                    {"limit": [ ("ciso_state_has_civil_society", "yes")]}
                 ] + init_global_orgset
             }]
         }
@@ -829,46 +1156,40 @@ class CivInstHandler(BaseHandler):
         trees = self.trees
         sgui_file = {}
         
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
+        for root, tree, flag in zip(self.roots, trees, self.flags):
             visible = ParadoxHelper.get_script_block(tree, "visible")
             sgui_file[f"{root}_is_aggro"] = [
-                {"scope": "state"},
-                {"is_shown": [{ f"{root}_is_aggro": "yes" }]},
+                ("scope", "state"),
+                {"is_shown": [(f"{root}_is_aggro", "yes")]},
             ]
             sgui_file[f"{root}_is_def"] = [
-                {"scope": "state"},
-                {"is_shown": [{ f"{root}_is_def": "yes" }]},
+                ("scope", "state"),
+                {"is_shown": [(f"{root}_is_def", "yes")]},
             ]
             sgui_file[f"{root}_is_coop"] = [
-                {"scope": "state"},
-                {"is_shown": [{ f"{root}_is_coop": "yes" }]},
+                ("scope", "state"),
+                {"is_shown": [(f"{root}_is_coop", "yes")]},
             ]
         
             sgui_file[f"{root}_is_radical_trigger_sgui"] = [
-                {"scope": "state"},
+                ("scope", "state"),
                 {
-                    "is_shown": [{ f"{root}_is_radical": "yes" }]
+                    "is_shown": [(f"{root}_is_radical", "yes")]
                 }
             ]
 
             sgui_file[f"{root}_is_loyalist_trigger_sgui"] = [
-                {"scope": "state"},
+                ("scope", "state"),
                 {
-                    "is_shown": [{ f"{root}_is_loyalist": "yes" }]
+                    "is_shown": [(f"{root}_is_loyalist", "yes")]
                 }
             ]
             
             sgui_file[f"{root}_creation_trigger_sgui"] = [
-                {"scope": "state"},
+                ("scope", "state"),
                 {
                     "is_shown": [{
-                        "NOT": {
-                            "is_target_in_variable_list": [
-                                {"name": "ciso_civil_institutions"},
-                                {"target": f"flag:{root}"}
-                            ]
-                        }
+                        "NOT": ParadoxHelper.target_in_list("ciso_civil_institutions", flag)
                     }] + visible
                 },
                 {
@@ -885,8 +1206,7 @@ class CivInstHandler(BaseHandler):
         trees = self.trees
         triggers_file = {}
         
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
+        for root, tree in zip(self.roots, trees):
             possible = ParadoxHelper.get_script_block(tree, "possible")
             visible = ParadoxHelper.get_script_block(tree, "visible")
             is_radical = ParadoxHelper.get_script_block(tree, "is_radical")
@@ -897,117 +1217,103 @@ class CivInstHandler(BaseHandler):
             triggers_file[f"{root}_is_radical"] = is_radical
             triggers_file[f"{root}_is_loyalist"] = is_loyalist
             triggers_file[f"{root}_is_aggro"] = [
-                {f"{root}_stance > 0": True}
+                (f"{root}_stance > 0", True)
             ]
             triggers_file[f"{root}_is_def"] = [
-                {f"{root}_stance": 0}
+                (f"{root}_stance", 0)
             ]
             triggers_file[f"{root}_is_coop"] = [
-                {f"{root}_stance < 0": True}
+                (f"{root}_stance < 0", True)
             ]
         
         return triggers_file
 
 class MeasureHandler(BaseHandler):
+    # (effect name, operator, amount) for every investment button in the sguis
+    INCRDECR_VARIANTS = (
+        ("increment", "add", "25"),
+        ("decrement", "subtract", "25"),
+        ("increment_alot", "add", "50"),
+        ("decrement_alot", "subtract", "50"),
+        ("increment_very_alot", "add", "100"),
+        ("decrement_very_alot", "subtract", "100"),
+        ("increment_alittle", "add", "10"),
+        ("decrement_alittle", "subtract", "10"),
+    )
 
     @handler(lambda c: c / "scripted_effects", "CISO_measures_magic_utils.txt")
     def handle_magic(self):
-        trees = self.trees
         magic_file = []
         imagic_file = []
 
-        with open(script_directory / "repetitemplate" / "repetitemplate-s1.txt") as f:
-            magic_file.append(ParadoxParser(f.read()).parse())
+        magic_file.append(ParadoxParser(ParadoxHelper.read_template("repetitemplate-s1.txt")).parse())
 
-        with open(script_directory / "repetitemplate" / "repetitemplate-p1.txt") as f:
-            p1 = f.read()
-        with open(script_directory / "repetitemplate" / "repetitemplate-p2.txt") as f:
-            p2 = f.read()
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            magic_file.append(ParadoxParser(p1.replace("<<root>>", root)).parse())
+        p1 = ParadoxHelper.read_template("repetitemplate-p1.txt")
+        p2 = ParadoxHelper.read_template("repetitemplate-p2.txt")
+        ip1 = ParadoxHelper.read_template("repetisimal-p1.txt")
         
-        with open(script_directory / "repetitemplate" / "repetitemplate-s2.txt") as f:
-            magic_file.append(ParadoxParser(f.read()).parse())
+        # One pass over the roots; each block keeps its place between the static parts
+        p1_blocks = []
+        p2_blocks = []
+        ip1_blocks = []
+        for root in self.roots:
+            p1_blocks.append(ParadoxHelper.parse_template(p1, root))
+            p2_blocks.append(ParadoxHelper.parse_template(p2, root))
+            ip1_blocks.append(ParadoxHelper.parse_template(ip1, root))
         
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            magic_file.append(ParadoxParser(p2.replace("<<root>>", root)).parse())
+        magic_file.extend(p1_blocks)
+        magic_file.append(ParadoxParser(ParadoxHelper.read_template("repetitemplate-s2.txt")).parse())
+        magic_file.extend(p2_blocks)
 
 
         # repitisimal
-        with open(script_directory / "repetitemplate" / "repetisimal-s1.txt") as f:
-            imagic_file.append(ParadoxParser(f.read()).parse())
-
-        with open(script_directory / "repetitemplate" / "repetisimal-p1.txt") as f:
-            p1 = f.read()
-
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            imagic_file.append(ParadoxParser(p1.replace("<<root>>", root)).parse())
-    
-        with open(script_directory / "repetitemplate" / "repetisimal-s2.txt") as f:
-            imagic_file.append(ParadoxParser(f.read()).parse())
+        imagic_file.append(ParadoxParser(ParadoxHelper.read_template("repetisimal-s1.txt")).parse())
+        imagic_file.extend(ip1_blocks)
+        imagic_file.append(ParadoxParser(ParadoxHelper.read_template("repetisimal-s2.txt")).parse())
 
 
         return {"ciso_do_every_measure_with_ci": magic_file, "ciso_calculate_atmosphere_stuff": imagic_file}
 
     @handler(lambda c: c / "scripted_effects", "CISO_measures_magic_values.txt")
     def handle_magic_values(self):
-        trees = self.trees
-        magic_file = [{"value": "0"}]
+        magic_file = [("value", "0")]
 
-        with open(script_directory / "repetitemplate" / "repetinew-p1.txt") as f:
-            p1 = f.read()
+        p1 = ParadoxHelper.read_template("repetinew-p1.txt")
 
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
+        for root in self.roots:
             magic_file.append({
-                "every_scope_pop": ParadoxParser(p1.replace("<<root>>", root)).parse()
+                "every_scope_pop": ParadoxHelper.parse_template(p1, root)
             })
 
         return {"ciso_get_ci_attraction_num": [
             {"save_scope_value_as": [
-                {"name": "ciso_total_ci_attraction_num_out" },
-                {"value": magic_file}
+                ("name", "ciso_total_ci_attraction_num_out"),
+                ("value", magic_file)
             ]}
         ]}
 
     @handler(lambda c: c / "institutions", "CISO_measures.txt")
     def handle_institution_icon(self):
-        trees = self.trees
-        institution_icon_file = {}
-        
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            icon = tree[root].get("icon", None)
-            if icon:
-                institution_icon_file[f"{root}_icon"] = [{
-                    "icon": f"\"{icon}\""
-                }]
-
-        return institution_icon_file
+        return self.institution_icons()
 
     @handler(lambda c: c / "scripted_effects", "CISO_measures_process.txt")
     def handle_process(self):
-        trees = self.trees
         process_file_monthly = []
         process_file_halfyearly = []
         
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
+        for root in self.roots:
             process_file_monthly.append({
                 "ciso_apply_ms_effect": [
-                    {"ms": root }
+                    ("ms", root)
                 ]
             })
             
         process_file_monthly.append({
             "if": [
                 {"limit": [
-                    {"owner": [{ "is_player": "yes"}]}
+                    {"owner": [("is_player", "yes")]}
                 ]},
-                { "ciso_update_ci_pop": "yes" }
+                ("ciso_update_ci_pop", "yes")
             ]
         })
 
@@ -1025,13 +1331,12 @@ class MeasureHandler(BaseHandler):
         trees = self.trees
         modifiers_file = {}
         
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
+        for root, tree in zip(self.roots, trees):
             icon = tree[root].get("icon", None)
             effects = ParadoxHelper.get_script_block(tree, "modifier")
             if icon:
                 modifiers_file[f"{root}_effect"] = [
-                    {"icon": f"\"{icon}\""}
+                    ("icon", f"\"{icon}\"")
                 ] + effects
             else:
                 modifiers_file[f"{root}_effect"] = effects
@@ -1041,52 +1346,41 @@ class MeasureHandler(BaseHandler):
 
     @handler(lambda c: c / "scripted_effects", "CISO_setup_measures.txt")
     def handle_setup(self):
-        trees = self.trees
-        init_global = []
-        
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            init_global.append({
-                "add_to_global_variable_list": [
-                    {"name": "ciso_society_measures" },
-                    {"target": f"flag:{root}"}
-                ]
-            })
+        init_global = [
+            ParadoxHelper.add_to_global_list("ciso_society_measures", flag)
+            for flag in self.flags
+        ]
 
         return {"ciso_init_measures_global": init_global}
 
     @handler(lambda c: c / "scripted_effects", "CISO_measure_utils.txt")
     def handle_utils(self):
-        trees = self.trees
         reset = []
         calc = [
             {"set_local_variable": [
-                {"name": "temp"},
-                {"value": "ciso_total_government_investment"}
+                ("name", "temp"),
+                ("value", "ciso_total_government_investment")
             ]},
-            {"remove_building": "building_ciso_magic_building"},
+            ("remove_building", "building_ciso_magic_building"),
             {"create_building": [
-                {"building": "building_ciso_magic_building" },
-                {"level": "local_var:temp" }
+                ("building", "building_ciso_magic_building"),
+                ("level", "local_var:temp")
             ]}
         ]
         
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
+        for root in self.roots:
             reset.extend([
                 {
                 "set_variable": [
-                    {"name": f"{root}_ci_investment_var" },
-                    {"value": f"0"}
+                    ("name", f"{root}_ci_investment_var"),
+                    ("value", f"0")
                 ]
                 }
             ])
 
-        with open(script_directory / "repetitemplate" / "repetires-p1.txt") as f:
-            ip1 = f.read()
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            reset.append(ParadoxParser(ip1.replace("<<root>>", root)).parse())
+        ip1 = ParadoxHelper.read_template("repetires-p1.txt")
+        for root in self.roots:
+            reset.append(ParadoxHelper.parse_template(ip1, root))
 
         return {
             "ciso_reset_all_measures_ci_invest": reset,
@@ -1097,18 +1391,17 @@ class MeasureHandler(BaseHandler):
     def handle_script_value(self):
         trees = self.trees
         script_value_file = {}
-        avg_alr_invested = [{"value": "0"}]
-        total_gov_inv = [{"value": "0"}]
+        avg_alr_invested = [("value", "0")]
+        total_gov_inv = [("value", "0")]
         
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
+        for root, tree in zip(self.roots, trees):
             attraction = ParadoxHelper.get_script_block(tree, "pop_weights")
             script_value_file[f"{root}_pop_weights"] = attraction
             script_value_file[f"{root}_efficiency"] = [
-                {"value": "ciso_B"},
+                ("value", "ciso_B"),
                 {"divide": [
-                    {"value": f"{root}_investment"},
-                    {"add": "ciso_B"}
+                    ("value", f"{root}_investment"),
+                    ("add", "ciso_B")
                 ]}
             ]
 
@@ -1116,31 +1409,25 @@ class MeasureHandler(BaseHandler):
                 "if": [
                     {
                         "limit": [
-                            {"has_variable": f"{root}_investment_var"}
+                            ("has_variable", f"{root}_investment_var")
                         ]
                     },
-                    {
-                        "value": f"var:{root}_investment_var"
-                    }
+                    ("value", f"var:{root}_investment_var")
                 ],
                 },
                 {
                     "else": [
-                        {
-                            "value": "0"
-                        }
+                        ("value", "0")
                     ]
                 },
                 {
                     "if": [
                         {
                             "limit": [
-                                {"has_variable": f"{root}_ci_investment_var"}
+                                ("has_variable", f"{root}_ci_investment_var")
                             ]
                         },
-                        {
-                            "add": f"var:{root}_ci_investment_var"
-                        }
+                        ("add", f"var:{root}_ci_investment_var")
                     ],
                 }
             ]
@@ -1149,19 +1436,15 @@ class MeasureHandler(BaseHandler):
                 "if": [
                     {
                         "limit": [
-                            {"has_variable": f"{root}_investment_var"}
+                            ("has_variable", f"{root}_investment_var")
                         ]
                     },
-                    {
-                        "value": f"var:{root}_investment_var"
-                    }
+                    ("value", f"var:{root}_investment_var")
                 ]
                 },
                 {
                     "else": [
-                        {
-                            "value": "0"
-                        }
+                        ("value", "0")
                     ]
                 }
             ]
@@ -1169,9 +1452,6 @@ class MeasureHandler(BaseHandler):
             total_gov_inv.append({
                 "add": f"{root}_investment_gov"
             })
-
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
             avg_alr_invested.append({
                 "add": f"{root}_investment"
             })
@@ -1191,20 +1471,14 @@ class MeasureHandler(BaseHandler):
         trees = self.trees
         sgui_file = {}
         
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
+        for root, tree, flag in zip(self.roots, trees, self.flags):
             visible = ParadoxHelper.get_script_block(tree, "visible")
             
             sgui_file[f"{root}_conditions_effect"] = [
-                {"scope": "state"},
+                ("scope", "state"),
                 {
                     "is_shown": [{
-                        "NOT": {
-                            "is_target_in_variable_list": [
-                                {"name": "ciso_society_measures"},
-                                {"target": f"flag:{root}"}
-                            ]
-                        }
+                        "NOT": ParadoxHelper.target_in_list("ciso_society_measures", flag)
                     }] + visible
                 },
                 {
@@ -1212,148 +1486,100 @@ class MeasureHandler(BaseHandler):
                         "if": [
                             {"limit": [{
                                 "NOT": [
-                                    {"has_variable": f"{root}_investment_var"}
+                                    ("has_variable", f"{root}_investment_var")
                                 ]
                             }]},
                             {
                                 "set_variable": [
-                                    {"name": f"{root}_investment_var"},
-                                    {"value": "0"}
+                                    ("name", f"{root}_investment_var"),
+                                    ("value", "0")
                                 ]
                             }
                         ]
                     },
                     {
                         "change_variable": [
-                            {"name": f"{root}_investment_var"},
-                            {"add": "50"}
+                            ("name", f"{root}_investment_var"),
+                            ("add", "50")
                         ]
                     },
                     {
                         "add_to_variable_list": [
-                            {"name": "ciso_society_measures"},
-                            {"target": f"flag:{root}"}
+                            ("name", "ciso_society_measures"),
+                            ("target", flag)
                         ]
                     },
-                    {"ciso_update_cost": "yes"},
+                    ("ciso_update_cost", "yes"),
                     {"ciso_apply_ms_effect": [
-                        {"ms": root}
+                        ("ms", root)
                     ]}
                     ]
                 }
             ]
-            sgui_file[f"{root}_increment_effect"] = self.generate_incrdecr_effect(
-                root, increment="add", value="25"
-            )
-            sgui_file[f"{root}_decrement_effect"] = self.generate_incrdecr_effect(
-                root, increment="subtract", value="25"
-            )
-            sgui_file[f"{root}_increment_alot_effect"] = self.generate_incrdecr_effect(
-                root, increment="add", value="50"
-            )
-            sgui_file[f"{root}_decrement_alot_effect"] = self.generate_incrdecr_effect(
-                root, increment="subtract", value="50"
-            )
-            sgui_file[f"{root}_increment_very_alot_effect"] = self.generate_incrdecr_effect(
-                root, increment="add", value="100"
-            )
-            sgui_file[f"{root}_decrement_very_alot_effect"] = self.generate_incrdecr_effect(
-                root, increment="subtract", value="100"
-            )
-            sgui_file[f"{root}_increment_alittle_effect"] = self.generate_incrdecr_effect(
-                root, increment="add", value="10"
-            )
-            sgui_file[f"{root}_decrement_alittle_effect"] = self.generate_incrdecr_effect(
-                root, increment="subtract", value="10"
-            )
+            for name, increment, value in MeasureHandler.INCRDECR_VARIANTS:
+                sgui_file[f"{root}_{name}_effect"] = self.generate_incrdecr_effect(
+                    root, increment=increment, value=value
+                )
         
         return sgui_file
 
     @staticmethod
     def generate_incrdecr_effect(root, increment="add", value="100"):
-        return [
-            {"scope": "state"},
-            {"effect": [
-                {
-                    "if": [
-                    {"limit": [{
-                        "NOT": [
-                            {"has_variable": f"{root}_investment_var"}
-                        ]
-                    }]},
-                    {
-                        "set_variable": [
-                            {"name": f"{root}_investment_var"},
-                            {"value": "0"}
-                        ]
-                    }]
+        # Every block here has unique keys, so plain dicts write the same
+        # lines as lists of single-entry blocks with far fewer objects
+        investment_var = f"{root}_investment_var"
+        return {
+            "scope": "state",
+            "effect": {
+                "if": {
+                    "limit": {
+                        "NOT": {"has_variable": investment_var}
+                    },
+                    "set_variable": {
+                        "name": investment_var,
+                        "value": "0"
+                    }
                 },
-                {
-                    "change_variable": [
-                        {"name": f"{root}_investment_var"},
-                        {increment: value}
-                    ]
+                "change_variable": {
+                    "name": investment_var,
+                    increment: value
                 },
-                {
-                    "clamp_variable": [
-                        {"name": f"{root}_investment_var"},
-                        {"min": "0"},
-                        {"max": "100000000"}
-                    ]
+                "clamp_variable": {
+                    "name": investment_var,
+                    "min": "0",
+                    "max": "100000000"
                 },
-                {"ciso_update_cost": "yes"},
-                {"ciso_apply_ms_effect": [
-                    {"ms": root}
-                ]}
-            ]}
-        ]
+                "ciso_update_cost": "yes",
+                "ciso_apply_ms_effect": {"ms": root}
+            }
+        }
 class Needs(BaseHandler):
     
     @handler(lambda c: c / "institutions", "CISO_needs.txt")
     def handle_institution_icon(self):
-        trees = self.trees
-        institution_icon_file = {}
-        
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            icon = tree[root].get("icon", None)
-            if icon:
-                institution_icon_file[f"{root}_icon"] = [{
-                    "icon": f"\"{icon}\""
-                }]
-
-        return institution_icon_file
+        return self.institution_icons()
 
     @handler(lambda c: c / "scripted_effects", "CISO_setup_needs.txt")
     def handle_setup(self):
-        trees = self.trees
-        init_global = []
-        
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            init_global.append({
-                "add_to_global_variable_list": [
-                    {"name": "ciso_needs" },
-                    {"target": f"flag:{root}"}
-                ]
-            })
+        init_global = [
+            ParadoxHelper.add_to_global_list("ciso_needs", flag)
+            for flag in self.flags
+        ]
 
         return {"ciso_init_needs_global": init_global}
 
     @handler(lambda c: c / "scripted_effects", "CISO_process_needs.txt")
     def handle_process(self):
         trees = self.trees
-        process_file_monthly = []
-
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            minv = tree[root].get("minimum", "999")
-            process_file_monthly.append({
+        process_file_monthly = [
+            {
                 "ciso_need_process_tooling_handle_needs": [
-                    {"ne": root },
-                    {"min":  minv }
+                    ("ne", root),
+                    ("min", tree[root].get("minimum", "999"))
                 ]
-            })
+            }
+            for root, tree in zip(self.roots, trees)
+        ]
 
         return {
             "ciso_needs_process_monthly": process_file_monthly
@@ -1363,29 +1589,23 @@ class Needs(BaseHandler):
     def handle_script_value(self):
         trees = self.trees
         script_value_file = {}
-        unfulfilled_needs = [{"value": 0}]
+        unfulfilled_needs = [("value", 0)]
         
-        for tree in trees:
+        for root, tree, flag in zip(self.roots, trees, self.flags):
             required_value = ParadoxHelper.get_script_block(tree, "required_value")
-            root = ParadoxHelper.get_root(tree)
-            script_value_file[f"{root}_fp"] = [{
-                "value": f"modifier:state_{root}_fp"
-            }]
+            script_value_file[f"{root}_fp"] = [("value", f"modifier:state_{root}_fp")]
             script_value_file[f"{root}_rfp"] = required_value
 
             unfulfilled_needs.append({
                 "if": [
-                    {"limit": [{
-                        "is_target_in_variable_list": [
-                            {"name": "ciso_needs"},
-                            {"target": f"flag:{root}"}
-                        ]
-                    }]},
+                    {"limit": [
+                        ParadoxHelper.target_in_list("ciso_needs", flag)
+                    ]},
                     {
                         "add": [
-                            { "value": f"{root}_rfp" },
-                            { "subtract": f"{root}_fp" },
-                            { "min": 0 }
+                            ("value", f"{root}_rfp"),
+                            ("subtract", f"{root}_fp"),
+                            ("min", 0)
                         ]
                     }
                 ]
@@ -1398,39 +1618,29 @@ class Needs(BaseHandler):
     @handler(lambda c: c / "scripted_guis", "CISO_sguis_needs.txt")
     def handle_sgui(self):
         trees = self.trees
-        sgui_file = {}
-        
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            visible = ParadoxHelper.get_script_block(tree, "visible")
-            
-            sgui_file[f"{root}_conditions_effect"] = [
-                {"scope": "state"},
+        sgui_file = {
+            f"{root}_conditions_effect": [
+                ("scope", "state"),
                 {
                     "is_shown": [{
-                        "NOT": {
-                            "is_target_in_variable_list": [
-                                {"name": "ciso_needs"},
-                                {"target": f"flag:{root}"}
-                            ]
-                        }
-                    }] + visible
+                        "NOT": ParadoxHelper.target_in_list("ciso_needs", flag)
+                    }] + ParadoxHelper.get_script_block(tree, "visible")
                 }
             ]
+            for root, tree, flag in zip(self.roots, trees, self.flags)
+        }
         
         return sgui_file
 
     @handler(lambda c: c / "modifier_type_definitions", "CISO_needs_modtypes.txt")
     def handle_modtype(self):
-        trees = self.trees
-        modtype_file = {}
-
-        for tree in trees:
-            root = ParadoxHelper.get_root(tree)
-            modtype_file[f"state_{root}_fp"] = [
-                {"decimals": "0"},
-                {"color": "good"}
+        modtype_file = {
+            f"state_{root}_fp": [
+                ("decimals", "0"),
+                ("color", "good")
             ]
+            for root in self.roots
+        }
 
         return modtype_file
 
@@ -1438,14 +1648,19 @@ class Needs(BaseHandler):
 
 if __name__ == "__main__":
     ciso_common = script_directory / "ciso_common"
-    civinsts = ciso_common / "civil_institutions"
-    files = list(civinsts.glob("*.txt"))
-    CivInstHandler(files)
-
-    measures = ciso_common / "measures"
-    measure_files = list(measures.glob("*.txt"))
-    MeasureHandler(measure_files)
-
-    needs = ciso_common / "needs"
-    need_files = list(needs.glob("*.txt"))
-    Needs(need_files)
\ No newline at end of file
+    jobs = [
+        (CivInstHandler, ParadoxHelper.list_script_files(ciso_common / "civil_institutions")),
+        (MeasureHandler, ParadoxHelper.list_script_files(ciso_common / "measures")),
+        (Needs, ParadoxHelper.list_script_files(ciso_common / "needs")),
+    ]
+    # Inputs are stat'ed once, before parsing, for both the check and the new stamp
+    jobs = [(handler_class, files, handler_class.input_stamp(files))
+            for handler_class, files in jobs]
+    jobs = [(handler_class, files, inputs) for handler_class, files, inputs in jobs
+            if not handler_class.is_up_to_date(files, inputs)]
+    
+    # Parse the inputs of every handler that has to run as one batch,
+    # so all three directories share a single worker pool
+    trees = iter(ParadoxHelper.parse_files([file for _, files, _ in jobs for file in files]))
+    for handler_class, files, inputs in jobs:
+        handler_class(files, trees=[next(trees) for _ in files], inputs=inputs)
@@ -17,42 +17,59 @@ This allocator:
 
 This is NOT exact.
 It is designed for large-n settings where exact KKT handling is too expensive.
+bisection_alloc and exact_alloc below solve the same problem to the KKT
+optimum, as references for how far the heuristic is off.
 """
 
 import math
+import operator
 
 
 # ============================================================
 # HEURISTIC ALLOCATOR
 # ============================================================
-def heuristic_alloc(initiatives, M, B):
-    import math
+def heuristic_alloc(initiatives, M, B, compute_values=True):
+    # Extract data, each column pulled out by a C-level map
+    names   = list(map(operator.itemgetter(0), initiatives))
+    weights = list(map(operator.itemgetter(1), initiatives))
+    x0s     = list(map(operator.itemgetter(2), initiatives))
+
+    return heuristic_alloc_arrays(names, weights, x0s, M, B, compute_values)
+
+
+def heuristic_alloc_arrays(names, weights, x0s, M, B, compute_values=True):
+    # Same allocation, for inputs already held as parallel columns.
+    # With compute_values=False only the allocation is returned, like the mod
+    # uses it: values and total come back as None.
+
+    # Bound once, not looked up on math for every element
+    sqrt = math.sqrt
 
     # Trivial case
-    n = len(initiatives)
+    n = len(weights)
     if n == 0 or M <= 0:
+        if not compute_values:
+            return [], [0.0] * n, None, None
         return [], [0.0] * n, [0.0] * n, 0.0
 
-    # Extract data
-    names   = [n for (n, w, x0) in initiatives]
-    weights = [w for (n, w, x0) in initiatives]
-    x0s     = [x0 for (n, w, x0) in initiatives]
-
 # Relevant mod section
 
     # --- Global averages ---
-    # This is just O(n) to compute
-    avg_sqrt_w = sum(math.sqrt(w) for w in weights) / n
-    avg_shift  = sum(B + x0 for x0 in x0s) / n
+    # This is just O(n) to compute, as two C-level reductions
+    # (the mean of B + x0 is B plus the mean of x0)
+    avg_sqrt_w = sum(map(sqrt, weights)) / n
+    avg_shift  = B + sum(x0s) / n
 
     # Just a constant calculation to get lambda
     lam = (B * avg_sqrt_w / (M / n + avg_shift)) ** 2
 
     # O(n) we do a constant math operation per initiative
-    x_raw = [0.0] * n
-    for i in range(n):
-        xi = B * math.sqrt(weights[i] / lam) - B - x0s[i]
-        x_raw[i] = max(0.0, xi)
+    # (a multiply by 1 / lambda instead of a divide)
+    inv_lam = 1.0 / lam
+    x_raw = [
+        max(0.0, B * sqrt(w * inv_lam) - B - x0)
+        for w, x0 in zip(weights, x0s)
+    ]
 
     # constant time
     # sum of raw allocations
@@ -69,10 +86,106 @@ def heuristic_alloc(initiatives, M, B):
 
 # / Relevant mod section
 
+    if not compute_values:
+        return names, x, None, None
+
     # Compute value === the mod code won't do this here since we'll only compute total value in the initiative code ===
     values = [
-        (x0s[i] + x[i]) * B / (B + x0s[i] + x[i])
-        for i in range(n)
+        (x0 + xi) * B / (B + x0 + xi)
+        for x0, xi in zip(x0s, x)
+    ]
+
+    return names, x, values, sum(values)
+
+# ============================================================
+# REFERENCE ALLOCATOR (BISECTION)
+# ============================================================
+def bisection_alloc(initiatives, M, B, rel_tol=1e-12, max_iter=200):
+    names   = list(map(operator.itemgetter(0), initiatives))
+    weights = list(map(operator.itemgetter(1), initiatives))
+    x0s     = list(map(operator.itemgetter(2), initiatives))
+
+    # Trivial case
+    n = len(weights)
+    if n == 0 or M <= 0:
+        return [], [0.0] * n, [0.0] * n, 0.0
+
+    # At the optimum x_i = max(0, B * sqrt(w_i) * mu - B - x0_i), mu = 1 / sqrt(lambda).
+    # The total handed out only grows with mu, so bisect mu until it equals M.
+    sqrt_ws = list(map(math.sqrt, weights))
+    if max(sqrt_ws) <= 0:
+        # Nobody gains anything from funding
+        x = [0.0] * n
+    else:
+        def allocated(mu):
+            return sum(max(0.0, B * sw * mu - B - x0) for sw, x0 in zip(sqrt_ws, x0s))
+
+        # The heuristic's mu already hands out at least M (dropping the max(0, .)
+        # terms leaves exactly M), so it is an upper bracket; mu = 0 hands out nothing
+        lo = 0.0
+        hi = (M / n + B + sum(x0s) / n) / (B * sum(sqrt_ws) / n)
+        for _ in range(max_iter):
+            if hi - lo <= rel_tol * hi:
+                break
+            mid = 0.5 * (lo + hi)
+            if allocated(mid) < M:
+                lo = mid
+            else:
+                hi = mid
+
+        x = [max(0.0, B * sw * hi - B - x0) for sw, x0 in zip(sqrt_ws, x0s)]
+
+    values = [
+        (x0 + xi) * B / (B + x0 + xi)
+        for x0, xi in zip(x0s, x)
+    ]
+
+    return names, x, values, sum(values)
+
+# ============================================================
+# REFERENCE ALLOCATOR (SORT AND SCAN)
+# ============================================================
+def exact_alloc(initiatives, M, B):
+    names   = list(map(operator.itemgetter(0), initiatives))
+    weights = list(map(operator.itemgetter(1), initiatives))
+    x0s     = list(map(operator.itemgetter(2), initiatives))
+
+    # Trivial case
+    n = len(weights)
+    if n == 0 or M <= 0:
+        return [], [0.0] * n, [0.0] * n, 0.0
+
+    # Initiative i gets funded once mu = 1 / sqrt(lambda) passes (B + x0_i) / (B * sqrt(w_i)),
+    # where its marginal value at its baseline matches lambda.
+    # Funding them in that order, mu for the first k funded has a closed form.
+    sqrt_ws = list(map(math.sqrt, weights))
+    order = sorted(
+        (i for i in range(n) if sqrt_ws[i] > 0),
+        key=lambda i: (B + x0s[i]) / (B * sqrt_ws[i])
+    )
+
+    x = [0.0] * n
+    if order:
+        shift_sum = 0.0
+        sqrt_w_sum = 0.0
+        for k, i in enumerate(order):
+            shift_sum += B + x0s[i]
+            sqrt_w_sum += sqrt_ws[i]
+            mu = (M + shift_sum) / (B * sqrt_w_sum)
+
+            # Stop once the next initiative would still get nothing at this mu
+            if k + 1 == len(order):
+                break
+            j = order[k + 1]
+            if mu <= (B + x0s[j]) / (B * sqrt_ws[j]):
+                break
+
+        for i in order[:k + 1]:
+            x[i] = max(0.0, B * sqrt_ws[i] * mu - B - x0s[i])
+
+    values = [
+        (x0 + xi) * B / (B + x0 + xi)
+        for x0, xi in zip(x0s, x)
     ]
 
     return names, x, values, sum(values)
@@ -212,6 +325,131 @@ def test_large_n_stability():
     assert total > 0
 
 
+def index_loop_alloc(initiatives, M, B):
+    # The allocator as originally written, index loops and all, to check the
+    # faster rewrite against
+    n = len(initiatives)
+    if n == 0 or M <= 0:
+        return [], [0.0] * n, [0.0] * n, 0.0
+
+    names   = [n for (n, w, x0) in initiatives]
+    weights = [w for (n, w, x0) in initiatives]
+    x0s     = [x0 for (n, w, x0) in initiatives]
+
+    avg_sqrt_w = sum(math.sqrt(w) for w in weights) / n
+    avg_shift  = sum(B + x0 for x0 in x0s) / n
+
+    lam = (B * avg_sqrt_w / (M / n + avg_shift)) ** 2
+
+    x_raw = [0.0] * n
+    for i in range(n):
+        xi = B * math.sqrt(weights[i] / lam) - B - x0s[i]
+        x_raw[i] = max(0.0, xi)
+
+    S = sum(x_raw)
+
+    if S > 0:
+        scale = M / S
+        x = [xi * scale for xi in x_raw]
+    else:
+        x = [0.0] * n
+
+    values = [
+        (x0s[i] + x[i]) * B / (B + x0s[i] + x[i])
+        for i in range(n)
+    ]
+
+    return names, x, values, sum(values)
+
+
+def test_matches_index_loop_formula():
+    cases = [
+        ([("A", 100, 0), ("B", 90, 0), ("C", 10, 0), ("D", 1, 0)], 1000, 500),
+        ([("A", 100, 0), ("B", 100, 1000), ("C", 100, 0)], 500, 300),
+        ([("Core", 200, 0), ("Side", 50, 0), ("Nice", 10, 0)], 100, 500),
+        ([("A", 10, 0), ("B", 20, 0)], 0, 100),
+        ([(f"I{i}", 10 + (i % 3), i % 30) for i in range(12)], 2000, 800),
+        ([(f"I{i}", 1 + (i % 5), i % 20) for i in range(1000)], 10_000, 1_000),
+    ]
+
+    for initiatives, M, B in cases:
+        names_o, x_o, values_o, total_o = index_loop_alloc(initiatives, M, B)
+
+        # Columns built directly, never as per-initiative tuples
+        names   = [name for name, _, _ in initiatives]
+        weights = [w for _, w, _ in initiatives]
+        x0s     = [x0 for _, _, x0 in initiatives]
+
+        for names_n, x_n, values_n, total_n in (
+            heuristic_alloc(initiatives, M, B),
+            heuristic_alloc_arrays(names, weights, x0s, M, B),
+        ):
+            # Rewritten sums and 1 / lambda may differ in the last bits only
+            tol = 1e-9 * max(M, 1)
+            assert names_n == names_o
+            assert all(abs(a - b) <= tol for a, b in zip(x_n, x_o)), "Allocation drifted from the original formula"
+            assert all(abs(a - b) <= tol for a, b in zip(values_n, values_o)), "Values drifted from the original formula"
+            assert abs(total_n - total_o) <= tol * len(initiatives)
+
+
+def objective(initiatives, x, B):
+    return sum(
+        w * B * (x0 + xi) / (B + x0 + xi)
+        for (_, w, x0), xi in zip(initiatives, x)
+    )
+
+
+def test_bisection_is_optimal():
+    cases = [
+        ([("A", 100, 0), ("B", 90, 0), ("C", 10, 0), ("D", 1, 0)], 1000, 500),
+        ([("A", 100, 0), ("B", 100, 1000), ("C", 100, 0)], 500, 300),
+        ([(f"I{i}", 1 + (i % 5), i % 20) for i in range(1000)], 10_000, 1_000),
+    ]
+
+    for initiatives, M, B in cases:
+        _, x_h, _, _ = heuristic_alloc(initiatives, M, B)
+        _, x_b, _, _ = bisection_alloc(initiatives, M, B)
+
+        assert all(xi >= 0 for xi in x_b), "Allocations must be non-negative"
+        assert abs(sum(x_b) - M) <= 1e-6 * M, "Bisection should spend the whole budget"
+        assert objective(initiatives, x_b, B) >= objective(initiatives, x_h, B) * (1 - 1e-9), \
+            "Exact allocation should be at least as good as the heuristic"
+
+
+def test_exact_matches_bisection():
+    cases = [
+        ([("A", 100, 0), ("B", 90, 0), ("C", 10, 0), ("D", 1, 0)], 1000, 500),
+        ([("A", 100, 0), ("B", 100, 1000), ("C", 100, 0)], 500, 300),
+        ([("Core", 200, 0), ("Side", 50, 0), ("Nice", 10, 0)], 100, 500),
+        ([("A", 0, 0), ("B", 10, 50)], 200, 100),
+        ([(f"I{i}", 1 + (i % 5), i % 20) for i in range(1000)], 10_000, 1_000),
+    ]
+
+    for initiatives, M, B in cases:
+        _, x_e, _, _ = exact_alloc(initiatives, M, B)
+        _, x_b, _, _ = bisection_alloc(initiatives, M, B)
+
+        assert abs(sum(x_e) - M) <= 1e-9 * M, "Sort and scan should spend the whole budget"
+        assert all(abs(a - b) <= 1e-6 * M for a, b in zip(x_e, x_b)), \
+            "Both exact allocators should find the same optimum"
+
+
+def test_skip_values():
+    initiatives = [
+        (f"I{i}", 1 + (i % 5), i % 20)
+        for i in range(1000)
+    ]
+
+    M = 10_000
+    B = 1_000
+
+    names, x, values, total = heuristic_alloc(initiatives, M, B, compute_values=False)
+    full_names, full_x, _, _ = heuristic_alloc(initiatives, M, B)
+
+    assert values is None and total is None
+    assert names == full_names and x == full_x, "Skipping values must not change the allocation"
+
+
 # ============================================================
 # RUN TESTS
 # ============================================================
@@ -222,4 +460,8 @@ if __name__ == "__main__":
     test_baseline_suppression()
     test_zero_budget()
     test_large_n_stability()
+    test_matches_index_loop_formula()
+    test_bisection_is_optimal()
+    test_exact_matches_bisection()
+    test_skip_values()
     print("All heuristic allocator tests passed.")